@@ -1,16 +1,20 @@
+import logging
+
 try:
     from . import config  # type: ignore
-    from .utils import rand_delay  # type: ignore
+    from .cache import cache_get, cache_put, text_sha256  # type: ignore
 except ImportError:
     import config  # type: ignore
-    from utils import rand_delay  # type: ignore
+    from cache import cache_get, cache_put, text_sha256  # type: ignore
 
+logger = logging.getLogger("smallpie.analysis")
+
+ANALYSIS_MODEL = "gpt-5.1"
 
-def analyze_with_gpt(meeting_name: str, meeting_topic: str, participants: str, transcript: str) -> str:
-    rand_delay("before GPT analysis")
-    print("[gpt] starting meeting analysis")
 
-    prompt = f"""
+# Everything up to the meeting fields is constant. Keeping it byte-identical at
+# the front of every prompt lets OpenAI's automatic prompt caching reuse it.
+ANALYSIS_INSTRUCTIONS = """
 You are an expert meeting analyst and diarization corrector.
 
 Your job is to take a raw transcript that may contain:
@@ -49,19 +53,49 @@ Rules:
 - If an insight is inferred but not explicit, tag it as "(inferred)".
 - Always output everything in English.
 
-Meeting name: {meeting_name}
-Topic: {meeting_topic}
-Participants: {participants}
-
---- TRANSCRIPT START ---
-{transcript}
---- TRANSCRIPT END ---
 """
 
+
+# Constant pieces around the four per-meeting fields, built once at import so
+# each call only joins them with the dynamic values.
+_PROMPT_PARTS = (
+    f"{ANALYSIS_INSTRUCTIONS}Meeting name: ",
+    "\nTopic: ",
+    "\nParticipants: ",
+    "\n\n--- TRANSCRIPT START ---\n",
+    "\n--- TRANSCRIPT END ---\n",
+)
+
+
+def analyze_with_gpt(meeting_name: str, meeting_topic: str, participants: str, transcript: str) -> str:
+    prompt = "".join(
+        (
+            _PROMPT_PARTS[0],
+            meeting_name,
+            _PROMPT_PARTS[1],
+            meeting_topic,
+            _PROMPT_PARTS[2],
+            participants,
+            _PROMPT_PARTS[3],
+            transcript,
+            _PROMPT_PARTS[4],
+        )
+    )
+
+    cache_key = text_sha256(ANALYSIS_MODEL, prompt)
+    cached = cache_get("analysis", cache_key)
+    if cached is not None:
+        return cached
+
+    logger.info("[gpt] starting meeting analysis")
+
     resp = config.client.responses.create(
-        model="gpt-5.1",
+        model=ANALYSIS_MODEL,
         input=prompt,
+        # Sent as a raw body field: older openai SDKs lack the keyword argument.
+        extra_body={"prompt_cache_key": "smallpie-analysis"},
     )
     text = resp.output_text.strip()
-    print("[gpt] analysis done, length:", len(text))
+    logger.info("[gpt] analysis done, length: %s", len(text))
+    cache_put("analysis", cache_key, text)
     return text
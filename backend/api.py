@@ -1,35 +1,51 @@
+import hmac
+import io
 import json
+import logging
+import os
 import queue
+import shutil
 import threading
 import uuid
-import sys
 from pathlib import Path
 
 from fastapi import FastAPI, File, Form, Header, UploadFile, WebSocket, WebSocketDisconnect, Request, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 try:
     from . import config  # type: ignore
+    from .audio import prewarm_whisper_model  # type: ignore
     from .auth import verify_bearer_token, verify_ws_token  # type: ignore
     from .pipeline import (  # type: ignore
         ThreadSafeTranscript,
         live_transcription_orchestrator,
+        shutdown_pipeline_pool,
         start_full_pipeline_in_thread,
     )
     from .tokens import issue_token, validate_token, revoke_session, revoke_token_by_jti  # type: ignore
 except ImportError:
     import config  # type: ignore
+    from audio import prewarm_whisper_model  # type: ignore
     from auth import verify_bearer_token, verify_ws_token  # type: ignore
     from pipeline import (  # type: ignore
         ThreadSafeTranscript,
         live_transcription_orchestrator,
+        shutdown_pipeline_pool,
         start_full_pipeline_in_thread,
     )
     from tokens import issue_token, validate_token, revoke_session, revoke_token_by_jti  # type: ignore
 
+logger = logging.getLogger("smallpie.api")
+
 app = FastAPI(title="smallpie backend", version="0.5.0")
 
+UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+_BOOTSTRAP_SECRET_BYTES = config.BOOTSTRAP_SECRET.encode("utf-8")
+_STOP_MARKERS = frozenset(("STOP", "END"))
+ENQUEUE_WAIT_SECONDS = 1.0  # backpressure waits re-check the orchestrator this often
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=config.ALLOW_ORIGINS,
@@ -39,6 +55,77 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def _startup():
+    config.init()
+    threading.Thread(target=prewarm_whisper_model, name="smallpie-prewarm", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def _shutdown():
+    shutdown_pipeline_pool()
+
+
+def _copy_upload(src, dst_path: Path):
+    """Copy an already-spooled upload to dst_path. Blocking; run it in the threadpool."""
+    start = src.tell()
+    size = src.seek(0, os.SEEK_END) - start
+    src.seek(start)
+    with dst_path.open("wb") as f:
+        # Anything bigger than one copy block is far past Starlette's in-memory
+        # spool limit, so fileno() is the real temp file (for small spools it
+        # would force a rollover): let the kernel copy it with sendfile.
+        if size > UPLOAD_CHUNK_BYTES:
+            try:
+                src_fd = src.fileno()
+                offset = start
+                while offset < start + size:
+                    sent = os.sendfile(f.fileno(), src_fd, offset, start + size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except (OSError, io.UnsupportedOperation):
+                f.seek(0)
+                f.truncate()
+                src.seek(start)
+        shutil.copyfileobj(src, f, UPLOAD_CHUNK_BYTES)
+
+
+async def _enqueue_audio(
+    data_queue: queue.Queue,
+    blob: bytes,
+    recording_stopped: threading.Event,
+    orchestrator: threading.Thread | None,
+) -> bool:
+    """
+    Hand an audio blob to the orchestrator. Blobs are never dropped while it is
+    consuming (that would corrupt the webm stream); when the queue is full we
+    wait for room in the threadpool, which keeps the event loop free and slows
+    the client down. Waits are bounded and re-check that the orchestrator is
+    still alive; returns False (blob dropped) once nothing will drain the queue.
+    """
+
+    def consumer_alive() -> bool:
+        return not recording_stopped.is_set() and (orchestrator is None or orchestrator.is_alive())
+
+    if not consumer_alive():
+        return False
+    try:
+        data_queue.put_nowait(blob)
+        return True
+    except queue.Full:
+        logger.warning("[ws] audio queue full (%s blobs), applying backpressure", data_queue.maxsize)
+
+    while consumer_alive():
+        try:
+            await run_in_threadpool(data_queue.put, blob, True, ENQUEUE_WAIT_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
 @app.post("/api/token")
 async def issue_session_token(
     request: Request,
@@ -63,14 +150,11 @@ async def issue_session_token(
 
     supplied = auth_value
     if authorization:
-        if not authorization.lower().startswith("bearer"):
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bootstrap token")
-        parts = authorization.split(None, 1)
-        if len(parts) < 2:
+        supplied = authorization[7:].strip() if authorization[:7].lower() == "bearer " else ""
+        if not supplied:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bootstrap token")
-        supplied = parts[1].strip()
 
-    if supplied != config.BOOTSTRAP_SECRET:
+    if not hmac.compare_digest(supplied.encode("utf-8"), _BOOTSTRAP_SECRET_BYTES):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid bootstrap token")
 
     if scope not in {"ws", "upload"}:
@@ -94,8 +178,8 @@ async def upload_meeting_file(
     authed = False
     token_payload = None
 
-    if authorization and authorization.lower().startswith("bearer "):
-        token_value = authorization.split(None, 1)[1].strip()
+    if authorization and authorization[:7].lower() == "bearer ":
+        token_value = authorization[7:].strip()
         try:
             token_payload = validate_token(token_value, "upload", client_host)
             authed = True
@@ -112,16 +196,13 @@ async def upload_meeting_file(
     original_suffix = Path(file.filename or "upload").suffix or ".bin"
     raw_path = config.AUDIO_DIR / f"{meeting_id}{original_suffix}"
 
-    with raw_path.open("wb") as f:
-        while True:
-            chunk = await file.read(1024 * 1024)
-            if not chunk:
-                break
-            f.write(chunk)
+    # Starlette has already spooled the whole body by now, so copy it in one
+    # threadpool hop instead of bouncing between the loop and a thread per chunk.
+    await run_in_threadpool(_copy_upload, file.file, raw_path)
 
-    print(f"[upload] stored uploaded file at {raw_path}")
+    logger.info("[upload] stored uploaded file at %s", raw_path)
 
-    start_full_pipeline_in_thread(raw_path, meeting_name, meeting_topic, participants, meeting_id, user_email=user_email)
+    queued = start_full_pipeline_in_thread(raw_path, meeting_name, meeting_topic, participants, meeting_id, user_email=user_email)
 
     if token_payload:
         revoke_session(token_payload["session_id"])
@@ -130,6 +211,7 @@ async def upload_meeting_file(
         {
             "status": "accepted",
             "meeting_id": meeting_id,
+            "queued": queued,
             "message": "File received. Processing will continue in the background.",
         }
     )
@@ -164,18 +246,18 @@ async def websocket_record(websocket: WebSocket):
     user_email = qp.get("user_email")
     meeting_id = token_payload["session_id"] if token_payload else uuid.uuid4().hex
 
-    print(f"[ws] new recording session meeting_id={meeting_id}")
+    logger.info("[ws] new recording session meeting_id=%s", meeting_id)
 
-    data_queue = queue.Queue()
+    data_queue: queue.Queue = queue.Queue(maxsize=config.LIVE_QUEUE_MAXSIZE)
     recording_stopped = threading.Event()
     transcript_store = ThreadSafeTranscript()
 
     try:
-        print("[ws] waiting for metadata message...")
+        logger.info("[ws] waiting for metadata message...")
         msg = await websocket.receive()
 
         if msg.get("type") == "websocket.disconnect":
-            print("[ws] client disconnected before metadata")
+            logger.info("[ws] client disconnected before metadata")
             return
 
         if "text" in msg and msg["text"] is not None:
@@ -187,17 +269,17 @@ async def websocket_record(websocket: WebSocket):
                     meeting_topic = meta.get("meeting_topic", meeting_topic)
                     participants = meta.get("participants", participants)
                     user_email = meta.get("user_email", user_email)
-                    print("[ws] metadata received:", meta)
+                    logger.info("[ws] metadata received: %s", meta)
                 else:
-                    print("[ws] first message not metadata, using defaults")
+                    logger.info("[ws] first message not metadata, using defaults")
             except Exception as e:
-                print(f"[ws] metadata parse error '{text}', using defaults: {e}")
+                logger.warning("[ws] metadata parse error %r, using defaults: %s", text, e)
         else:
-            print("[ws] first message was not text, using defaults")
+            logger.info("[ws] first message was not text, using defaults")
             if "bytes" in msg and msg["bytes"] is not None:
-                data_queue.put(msg["bytes"])
+                await _enqueue_audio(data_queue, msg["bytes"], recording_stopped, None)
 
-        print(f"[ws] resolved: name={meeting_name} topic={meeting_topic}")
+        logger.info("[ws] resolved: name=%s topic=%s", meeting_name, meeting_topic)
         orchestrator = threading.Thread(
             target=live_transcription_orchestrator,
             args=(
@@ -213,46 +295,52 @@ async def websocket_record(websocket: WebSocket):
             daemon=True,
         )
         orchestrator.start()
-        print("[ws] live transcription orchestrator started")
+        logger.info("[ws] live transcription orchestrator started")
 
         while True:
             msg = await websocket.receive()
 
             if msg.get("type") == "websocket.disconnect":
-                print("[ws] websocket.disconnect received")
+                logger.info("[ws] websocket.disconnect received")
                 break
 
             if "bytes" in msg and msg["bytes"] is not None:
-                data_queue.put(msg["bytes"])
+                if not await _enqueue_audio(data_queue, msg["bytes"], recording_stopped, orchestrator):
+                    logger.warning("[ws] live transcription is no longer consuming audio, closing session")
+                    await websocket.close(code=1011)
+                    break
                 continue
 
             if "text" in msg and msg["text"] is not None:
                 text = msg["text"].strip()
 
-                try:
-                    parsed = json.loads(text)
-                    if isinstance(parsed, dict) and parsed.get("type", "").lower() == "end":
-                        print("[ws] received stop marker (json)")
+                # Plain-text frames are checked against the markers directly;
+                # only JSON objects go through the parser (and its exception path).
+                if text[:1] != "{":
+                    upper = text.upper()
+                    if upper in _STOP_MARKERS:
+                        logger.info("[ws] received stop marker: %s", upper)
                         break
-                except Exception:
-                    pass
-
-                upper = text.upper()
-                if upper in ("STOP", "END"):
-                    print(f"[ws] received stop marker: {upper}")
-                    break
-
-                print("[ws] ignoring text message:", repr(text))
+                else:
+                    try:
+                        parsed = json.loads(text)
+                        if isinstance(parsed, dict) and parsed.get("type", "").lower() == "end":
+                            logger.info("[ws] received stop marker (json)")
+                            break
+                    except Exception:
+                        pass
+
+                logger.debug("[ws] ignoring text message: %r", text)
                 continue
 
     except WebSocketDisconnect:
-        print("[ws] client disconnected")
+        logger.info("[ws] client disconnected")
     except Exception as e:
-        print(f"[ws] error while receiving audio: {e}", file=sys.stderr)
+        logger.warning("[ws] error while receiving audio: %s", e)
     finally:
         if token_payload:
             revoke_session(token_payload["session_id"])
-        print(f"[ws] client disconnected, signaling orchestrator to stop")
+        logger.info("[ws] client disconnected, signaling orchestrator to stop")
         recording_stopped.set()
 
         try:
@@ -1,6 +1,13 @@
+import contextlib
+import functools
+import logging
+import os
+import queue
+import re
 import subprocess
-import sys
 import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 try:
@@ -8,9 +15,67 @@ try:
 except ImportError:
     import config  # type: ignore
 
+logger = logging.getLogger("smallpie.audio")
 
-def run_ffprobe_duration(path: Path) -> float:
-    """Return duration in seconds for an audio file using ffprobe."""
+# "[00:00:00.000 --> 00:00:05.120]  " prefix on each segment line whisper-cli prints
+_WHISPER_TIMESTAMP = re.compile(r"^\[[^\]]*-->[^\]]*\]\s*", re.MULTILINE)
+
+
+def _whisper_cpu_slots() -> queue.SimpleQueue | None:
+    """
+    One CPU set per concurrent whisper job: contiguous blocks of
+    WHISPER_THREADS usable cores, wrapping around if there are too few.
+    None unless SMALLPIE_WHISPER_PIN_CPUS is set.
+    """
+    if not config.WHISPER_PIN_CPUS or not hasattr(os, "sched_setaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    width = min(config.WHISPER_THREADS, len(cpus))
+    slots: queue.SimpleQueue = queue.SimpleQueue()
+    for job in range(config.WHISPER_CONCURRENCY):
+        start = job * width
+        slots.put(frozenset(cpus[(start + i) % len(cpus)] for i in range(width)))
+    return slots
+
+
+# Holding the whisper semaphore guarantees a free slot, so get() never blocks.
+_WHISPER_CPU_SLOTS = _whisper_cpu_slots()
+
+
+def _pinned_whisper_env() -> dict[str, str]:
+    """
+    Environment for a pinned whisper job, built from the current os.environ.
+    Overrides OMP_NUM_THREADS to WHISPER_THREADS and forces OpenBLAS/MKL to a
+    single thread (ggml runs its own workers; nested BLAS pools would spill
+    outside the pinned cores), whatever the process environment says.
+    """
+    return {
+        **os.environ,
+        "OMP_NUM_THREADS": str(config.WHISPER_THREADS),
+        "OPENBLAS_NUM_THREADS": "1",
+        "MKL_NUM_THREADS": "1",
+    }
+
+
+def wav_duration(path: Path) -> float | None:
+    """
+    Duration in seconds read straight from a PCM WAV header.
+    Returns None for anything the wave module can't parse (webm, m4a, ...).
+    """
+    try:
+        with wave.open(str(path), "rb") as w:
+            rate = w.getframerate()
+            return w.getnframes() / rate if rate else 0.0
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _ffprobe_duration(path_str: str, mtime_ns: int, size: int) -> float:
+    """
+    ffprobe a file's duration. Memoized on (path, mtime, size), so repeat
+    probes of an unchanged file skip the fork/exec; any rewrite changes the key.
+    """
     try:
         out = subprocess.check_output(
             [
@@ -21,173 +86,360 @@ def run_ffprobe_duration(path: Path) -> float:
                 "format=duration",
                 "-of",
                 "default=noprint_wrappers=1:nokey=1",
-                str(path),
+                path_str,
             ]
         ).decode().strip()
 
         if out == "N/A":
-            print(
-                f"[ffprobe] duration 'N/A' for {path} (likely empty/corrupt segment)",
-                file=sys.stderr,
-            )
+            logger.warning("[ffprobe] duration 'N/A' for %s (likely empty/corrupt segment)", path_str)
             return 0.0
 
         return float(out)
     except Exception as e:
-        print(f"[ffprobe] failed to read duration for {path}: {e}", file=sys.stderr)
+        logger.warning("[ffprobe] failed to read duration for %s: %s", path_str, e)
         return 0.0
 
 
-def convert_to_wav(src_path: Path) -> Path:
+def run_ffprobe_duration(path: Path) -> float:
     """
-    Convert any browser-uploaded/recorded format (webm, m4a, mp3, etc.)
-    into a mono 16 kHz WAV suitable for whisper.cpp.
+    Return duration in seconds for an audio file.
+    PCM WAVs are answered from the header; everything else goes through ffprobe.
+    """
+    duration = wav_duration(path)
+    if duration is not None:
+        return duration
+
+    try:
+        st = path.stat()
+    except OSError as e:
+        logger.warning("[ffprobe] failed to read duration for %s: %s", path, e)
+        return 0.0
+    return _ffprobe_duration(str(path), st.st_mtime_ns, st.st_size)
+
+
+def prewarm_whisper_model():
+    """
+    Pull the whisper model file into the page cache so the first whisper-cli
+    runs don't stall on cold reads of a >1 GB file. Best-effort; meant to run
+    in a background thread at startup.
+    """
+    if config.whisper_http is not None:
+        return  # whisper-server keeps its own copy loaded
+
+    try:
+        with open(config.WHISPER_MODEL, "rb") as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            while f.read(4 * 1024 * 1024):
+                pass
+        logger.info("[whisper] model %s prewarmed into page cache", config.WHISPER_MODEL)
+    except OSError as e:
+        logger.warning("[whisper] failed to prewarm model %s: %s", config.WHISPER_MODEL, e)
+
+
+def is_whisper_ready_wav(path: Path) -> bool:
+    """True if path is already a mono 16 kHz 16-bit PCM WAV (what whisper.cpp wants)."""
+    try:
+        with wave.open(str(path), "rb") as w:
+            return w.getnchannels() == 1 and w.getframerate() == 16000 and w.getsampwidth() == 2
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def _ffmpeg_segment_wav(wav_path: Path, chunk_seconds: int, out_dir: Path) -> list[Path]:
+    """
+    Slice a WAV file into smaller WAV chunks with a single ffmpeg
+    segment-muxer pass, written into out_dir.
+    The segment muxer stops at EOF on its own, so no duration probe is needed;
+    an empty or unreadable input simply yields no chunks.
+    Samples are re-encoded as pcm_s16le (a plain copy for PCM input) rather than
+    stream-copied, so cuts are not snapped to the demuxer's packet boundaries.
     """
-    dst = Path(tempfile.NamedTemporaryFile(delete=False, suffix=".wav").name)
     cmd = [
         "ffmpeg",
         "-y",
+        "-threads",
+        "0",
         "-i",
-        str(src_path),
-        "-ac",
+        str(wav_path),
+        "-vn",
+        "-f",
+        "segment",
+        "-segment_format",
+        "wav",
+        "-segment_time",
+        str(chunk_seconds),
+        "-reset_timestamps",
         "1",
-        "-ar",
-        "16000",
-        str(dst),
+        "-c:a",
+        "pcm_s16le",
+        "-avoid_negative_ts",
+        "make_zero",
+        str(out_dir / "chunk_%04d.wav"),
     ]
-    print(f"[ffmpeg] {src_path} -> {dst}")
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-    return dst
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return sorted(out_dir.glob("chunk_*.wav"))
 
 
-def slice_wav_to_chunks(wav_path: Path, chunk_seconds: int) -> list[Path]:
+def slice_wav_to_chunks(wav_path: Path, chunk_seconds: int, out_dir: Path) -> list[Path]:
     """
-    Slice a long WAV file into smaller WAV chunks using ffmpeg.
-    Returns list of chunk paths.
+    Slice a long WAV file into chunk_seconds WAV chunks, written into out_dir.
+    Returns list of chunk paths in playback order.
+    For PCM every chunk is just a header plus a run of frames copied from the
+    source, so this is done in-process with the wave module. Files it can't
+    parse fall back to one ffmpeg segment pass.
     """
-    duration = run_ffprobe_duration(wav_path)
-    if duration == 0.0:
-        print(f"[slice_wav] duration is 0.0s for {wav_path}, skipping.")
-        return []
+    try:
+        src = wave.open(str(wav_path), "rb")
+    except (wave.Error, EOFError, OSError):
+        chunks = _ffmpeg_segment_wav(wav_path, chunk_seconds, out_dir)
+    else:
+        chunks = []
+        with src:
+            params = src.getparams()
+            frames_per_chunk = chunk_seconds * params.framerate
+            while data := src.readframes(frames_per_chunk):
+                chunk_path = out_dir / f"chunk_{len(chunks):04d}.wav"
+                with wave.open(str(chunk_path), "wb") as dst:
+                    dst.setparams(params)
+                    dst.writeframes(data)
+                chunks.append(chunk_path)
+
+    for idx, chunk_path in enumerate(chunks, start=1):
+        logger.debug("[ffmpeg] chunk %s: %s", idx, chunk_path)
 
-    chunks = []
-    start = 0.0
-    idx = 1
+    return chunks
 
-    while start < duration:
-        end = min(start + chunk_seconds, duration)
-        if (end - start) < 0.1:
-            break
 
-        chunk_path = Path(tempfile.NamedTemporaryFile(delete=False, suffix=".wav").name)
+def convert_and_segment(src_path: Path, chunk_seconds: int, out_dir: Path) -> list[Path]:
+    """
+    Decode any browser-uploaded/recorded format (webm, m4a, mp3, etc.),
+    resample to mono 16 kHz and cut it into chunk_seconds WAV chunks in one
+    ffmpeg run, so no full-length intermediate WAV is ever written.
+    Inputs that are already whisper-ready skip the decode and resample and are only segmented.
+    Raises CalledProcessError if ffmpeg fails.
+    """
+    if is_whisper_ready_wav(src_path):
+        logger.info("[ffmpeg] %s is already mono 16 kHz PCM, segmenting without resampling", src_path)
+        return slice_wav_to_chunks(src_path, chunk_seconds, out_dir)
 
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i",
-            str(wav_path),
-            "-ss",
-            str(start),
-            "-to",
-            str(end),
-            "-acodec",
-            "copy",
-            str(chunk_path),
-        ]
-        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        print(f"[ffmpeg] chunk {idx}: {start:.1f}s -> {end:.1f}s -> {chunk_path}")
-        chunks.append(chunk_path)
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-threads",
+        "0",
+        "-i",
+        str(src_path),
+        "-ac",
+        "1",
+        "-ar",
+        "16000",
+        "-vn",
+        "-f",
+        "segment",
+        "-segment_format",
+        "wav",
+        "-segment_time",
+        str(chunk_seconds),
+        "-reset_timestamps",
+        "1",
+        str(out_dir / "chunk_%04d.wav"),
+    ]
+    logger.info("[ffmpeg] %s -> %s/chunk_*.wav", src_path, out_dir)
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
 
-        idx += 1
-        start = end
+    chunks = sorted(out_dir.glob("chunk_*.wav"))
+    for idx, chunk_path in enumerate(chunks, start=1):
+        logger.debug("[ffmpeg] chunk %s: %s", idx, chunk_path)
 
     return chunks
 
 
-def _transcribe_single_chunk(chunk_path: Path) -> str:
-    """Call whisper-cli on a single WAV chunk and return plain text transcript."""
-    if not chunk_path.exists() or chunk_path.stat().st_size < 100:
-        print(f"[whisper] skipping empty/invalid chunk file: {chunk_path}")
-        return ""
+def _transcribe_via_server(chunk_path: Path) -> str:
+    """POST one WAV chunk to the resident whisper-server and return its text."""
+    with chunk_path.open("rb") as f:
+        resp = config.whisper_http.post(
+            "/inference",
+            files={"file": (chunk_path.name, f, "audio/wav")},
+            data={"response_format": "text", "language": "auto"},
+        )
+    resp.raise_for_status()
+    return resp.text.strip()
 
-    print(f"[whisper] waiting for semaphore to run on: {chunk_path}")
-    with config.WHISPER_SEMAPHORE:
-        print(f"[whisper] semaphore ACQUIRED, running on chunk: {chunk_path}")
 
-        out_prefix = Path(tempfile.NamedTemporaryFile(delete=False).name)
+def _transcribe_chunk_batch(chunk_paths: list[Path]) -> list[str]:
+    """
+    Call whisper-cli once on several WAV chunks, so the model is loaded a
+    single time for the whole batch. Returns one transcript per chunk, in
+    the same order; empty/invalid chunks yield "".
+    """
+    valid = [p for p in chunk_paths if p.exists() and p.stat().st_size >= 100]
+    for p in chunk_paths:
+        if p not in valid:
+            logger.debug("[whisper] skipping empty/invalid chunk file: %s", p)
+    if not valid:
+        return [""] * len(chunk_paths)
+
+    if config.whisper_http is not None:
+        texts = []
+        for p in chunk_paths:
+            if p not in valid:
+                texts.append("")
+                continue
+            with config.WHISPER_SEMAPHORE:
+                try:
+                    texts.append(_transcribe_via_server(p))
+                except Exception as e:
+                    logger.warning("[whisper] whisper-server failed on %s: %s", p, e)
+                    texts.append("")
+        return texts
+
+    # A lone chunk's transcript is exactly whisper-cli's stdout, so it is read
+    # straight from the pipe; batches need -otxt to tell the files apart.
+    single = len(valid) == 1
+
+    logger.debug("[whisper] waiting for semaphore to run on %s chunk(s)", len(valid))
+    with config.WHISPER_SEMAPHORE:
+        logger.debug("[whisper] semaphore ACQUIRED, running on %s..%s", valid[0].name, valid[-1].name)
 
         cmd = [
             config.WHISPER_CLI,
             "-m",
             config.WHISPER_MODEL,
-            "-f",
-            str(chunk_path),
-            "-otxt",
-            "-of",
-            str(out_prefix),
             "-t",
             str(config.WHISPER_THREADS),
             "-l",
             "auto",
         ]
+        if not single:
+            cmd.append("-otxt")
+        if config.WHISPER_VAD_MODEL:
+            cmd.extend(["--vad", "--vad-model", config.WHISPER_VAD_MODEL])
+        for p in valid:
+            cmd.extend(["-f", str(p)])
+
+        cpus = _WHISPER_CPU_SLOTS.get() if _WHISPER_CPU_SLOTS is not None else None
+        try:
+            with open(config.WHISPER_LOG, "ab") if config.WHISPER_LOG else contextlib.nullcontext(subprocess.DEVNULL) as err:
+                with subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE if single else subprocess.DEVNULL,
+                    stderr=err,
+                    env=_pinned_whisper_env() if cpus else None,
+                ) as proc:
+                    # Pinned from the parent right after spawn (preexec_fn is not
+                    # safe with threads); whisper starts its compute threads only
+                    # after loading the model, so they inherit the mask.
+                    if cpus:
+                        try:
+                            os.sched_setaffinity(proc.pid, cpus)
+                        except OSError as e:
+                            logger.debug("[whisper] could not pin pid %s: %s", proc.pid, e)
+                    stdout, _ = proc.communicate()
+        finally:
+            if cpus is not None:
+                _WHISPER_CPU_SLOTS.put(cpus)
+
+        logger.debug("[whisper] semaphore RELEASED for %s..%s", valid[0].name, valid[-1].name)
+
+    if single:
+        text = _WHISPER_TIMESTAMP.sub("", stdout.decode("utf-8", errors="replace")).strip()
+        return [text if p == valid[0] else "" for p in chunk_paths]
+
+    # Without -of, whisper-cli writes <input>.txt next to each input; the
+    # chunks live in a per-transcription temp dir, so these do too.
+    texts = []
+    for p in chunk_paths:
+        txt_path = Path(f"{p}.txt")
+        try:
+            texts.append(txt_path.read_text(encoding="utf-8").strip())
+        except FileNotFoundError:
+            texts.append("")
+        txt_path.unlink(missing_ok=True)
+    return texts
 
-        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-        txt_candidate = out_prefix.with_suffix(".txt")
-        if not txt_candidate.exists():
-            txt_candidate = out_prefix
+def _transcribe_and_discard_batch(chunk_paths: list[Path], first_idx: int, total: int) -> list[str]:
+    """
+    Pool worker: transcribe one batch of chunks and delete them right away.
+    A failing batch yields empty parts instead of aborting the whole run.
+    """
+    last_idx = first_idx + len(chunk_paths) - 1
+    logger.debug("[pipeline] transcribing chunks %s-%s/%s", first_idx, last_idx, total)
+    try:
+        return _transcribe_chunk_batch(chunk_paths)
+    except Exception as e:
+        logger.warning("[whisper] failed to transcribe chunks %s-%s/%s: %s", first_idx, last_idx, total, e)
+        return [""] * len(chunk_paths)
+    finally:
+        for chunk_path in chunk_paths:
+            try:
+                chunk_path.unlink()
+            except FileNotFoundError:
+                pass
 
-        try:
-            text = txt_candidate.read_text(encoding="utf-8").strip()
-        except FileNotFoundError:
-            text = ""
 
-        try:
-            txt_candidate.unlink(missing_ok=True)
-            out_prefix.unlink(missing_ok=True)
-        except TypeError:
-            if txt_candidate.exists():
-                txt_candidate.unlink()
-            if out_prefix.exists():
-                out_prefix.unlink()
+def transcribe_chunks(chunks: list[Path]) -> str:
+    """
+    Transcribe already-sliced WAV chunks and join the text in chunk order.
+    Each chunk is deleted as soon as its batch has been transcribed.
+    """
+    total = len(chunks)
+    logger.info("[pipeline] total chunks: %s", total)
+
+    # One contiguous batch per whisper slot: every slot loads the model once
+    # and the pool never has workers parked on the semaphore. map() keeps the
+    # batches, and so the chunks, in order.
+    per_batch = max(1, -(-total // config.WHISPER_CONCURRENCY))
+    starts = range(0, total, per_batch)
+    batches = [chunks[i : i + per_batch] for i in starts]
+    with ThreadPoolExecutor(max_workers=config.WHISPER_CONCURRENCY) as pool:
+        results = pool.map(_transcribe_and_discard_batch, batches, [i + 1 for i in starts], [total] * len(batches))
+        parts = [text for batch in results for text in batch]
 
-        print(f"[whisper] semaphore RELEASED for chunk: {chunk_path}")
-        return text
+    transcript = "\n\n".join(p for p in parts if p.strip())
+    logger.info("[pipeline] transcription complete, length: %s", len(transcript))
+    return transcript
+
+
+def transcribe_wav_segments(wav_files: list[Path]) -> list[str]:
+    """
+    Transcribe several short WAV files (each at most CHUNK_SECONDS) with one
+    whisper run. Returns one text per file, in order; the files are deleted.
+    """
+    return _transcribe_and_discard_batch(wav_files, 1, len(wav_files))
 
 
 def transcribe_wav_file(wav_file: Path) -> str:
-    """Transcribes a single WAV file."""
-    print(f"[pipeline] starting local transcription for {wav_file}")
+    """
+    Transcribes a single WAV file.
+    The file is deleted afterwards.
+    """
+    logger.info("[pipeline] starting local transcription for %s", wav_file)
 
     duration = run_ffprobe_duration(wav_file)
-    print(f"[pipeline] wav duration ~ {duration:.1f} seconds")
+    logger.debug("[pipeline] wav duration ~ %.1f seconds", duration)
 
     if duration == 0.0:
-        print(f"[pipeline] WAV {wav_file} has 0.0 duration, aborting transcription")
+        logger.info("[pipeline] WAV %s has 0.0 duration, aborting transcription", wav_file)
         try:
             wav_file.unlink()
         except FileNotFoundError:
             pass
         return ""
 
-    chunks = slice_wav_to_chunks(wav_file, config.CHUNK_SECONDS)
-    print(f"[pipeline] total chunks: {len(chunks)}")
+    # Live segments are already CHUNK_SECONDS long: transcribe them as they are
+    # (this also deletes the file) instead of copying them into a one-chunk slice.
+    if duration <= config.CHUNK_SECONDS + 1.0:
+        return transcribe_wav_segments([wav_file])[0]
 
-    parts: list[str] = []
-    for idx, chunk in enumerate(chunks, start=1):
-        print(f"[pipeline] transcribing chunk {idx}/{len(chunks)}")
-        text = _transcribe_single_chunk(chunk)
-        parts.append(text)
-        try:
-            chunk.unlink()
-        except FileNotFoundError:
-            pass
+    with tempfile.TemporaryDirectory(prefix="smallpie_chunks_", dir=config.scratch_dir()) as chunk_dir:
+        chunks = slice_wav_to_chunks(wav_file, config.CHUNK_SECONDS, Path(chunk_dir))
+        transcript = transcribe_chunks(chunks)
 
     try:
         wav_file.unlink()
     except FileNotFoundError:
         pass
 
-    transcript = "\n\n".join(p for p in parts if p.strip())
-    print("[pipeline] transcription complete, length:", len(transcript))
     return transcript
@@ -1,3 +1,6 @@
+import hmac
+import logging
+
 from fastapi import HTTPException
 
 try:
@@ -5,6 +8,15 @@ try:
 except ImportError:
     import config  # type: ignore
 
+logger = logging.getLogger("smallpie.auth")
+
+_ACCESS_TOKEN_BYTES = config.ACCESS_TOKEN.encode("utf-8")
+
+
+def _token_matches(token: str) -> bool:
+    """Constant-time check of a supplied token against SMALLPIE_ACCESS_TOKEN."""
+    return hmac.compare_digest(token.encode("utf-8"), _ACCESS_TOKEN_BYTES)
+
 
 def verify_bearer_token(authorization: str | None):
     """
@@ -17,12 +29,11 @@ def verify_bearer_token(authorization: str | None):
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing Authorization header")
 
-    parts = authorization.split()
-    if len(parts) != 2 or parts[0].lower() != "bearer":
+    token = authorization[7:].strip() if authorization[:7].lower() == "bearer " else ""
+    if not token:
         raise HTTPException(status_code=401, detail="Invalid Authorization header format")
 
-    token = parts[1].strip()
-    if token != config.ACCESS_TOKEN:
+    if not _token_matches(token):
         raise HTTPException(status_code=401, detail="Invalid access token")
 
 
@@ -35,11 +46,11 @@ def verify_ws_token(token: str | None) -> bool:
         return True
 
     if not token:
-        print("[auth] WebSocket missing token")
+        logger.warning("[auth] WebSocket missing token")
         return False
 
-    if token != config.ACCESS_TOKEN:
-        print("[auth] WebSocket invalid token")
+    if not _token_matches(token):
+        logger.warning("[auth] WebSocket invalid token")
         return False
 
     return True
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    from . import config  # type: ignore
+except ImportError:
+    import config  # type: ignore
+
+logger = logging.getLogger("smallpie.cache")
+
+# In-process LRU in front of the on-disk entries, so a replay within the same
+# process skips the file read too. Only used when the cache is enabled.
+MEMORY_CACHE_ENTRIES = 128
+_memory: OrderedDict[tuple[str, str], str] = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _memory_put(kind: str, key: str, text: str):
+    with _memory_lock:
+        _memory[(kind, key)] = text
+        _memory.move_to_end((kind, key))
+        while len(_memory) > MEMORY_CACHE_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def file_sha256(path: Path) -> str:
+    """
+    SHA-256 of a file's contents. The file is mmap'ed so the kernel pages it
+    in directly instead of copying it through Python read buffers.
+    """
+    with path.open("rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.sha256(mm).hexdigest()
+        except ValueError:
+            # mmap refuses empty files
+            return hashlib.sha256(f.read()).hexdigest()
+
+
+def text_sha256(*parts: str) -> str:
+    """SHA-256 over several strings, NUL-separated so ("ab", "c") != ("a", "bc")."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def cache_get(kind: str, key: str) -> str | None:
+    """
+    Return the cached text for (kind, key), or None on a miss.
+    Always a miss when SMALLPIE_CACHE_DIR is not set.
+    """
+    if not config.CACHE_ENABLED:
+        return None
+
+    with _memory_lock:
+        text = _memory.get((kind, key))
+        if text is not None:
+            _memory.move_to_end((kind, key))
+    if text is not None:
+        logger.info("[cache] %s memory hit for %s", kind, key[:12])
+        return text
+
+    path = config.CACHE_DIR / kind / f"{key}.txt"
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("[cache] failed to read %s: %s", path, e)
+        return None
+
+    logger.info("[cache] %s hit for %s", kind, key[:12])
+    _memory_put(kind, key, text)
+    return text
+
+
+def cache_put(kind: str, key: str, text: str):
+    """
+    Store text under (kind, key). Best-effort: never raises.
+    Written to a temp file and renamed into place, so a concurrent cache_get
+    or a crash mid-write never sees a truncated entry.
+    """
+    if not config.CACHE_ENABLED:
+        return
+
+    _memory_put(kind, key, text)
+    folder = config.CACHE_DIR / kind
+    tmp_path: Path | None = None
+    try:
+        folder.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=folder, prefix=f".{key}.", suffix=".tmp")
+        tmp_path = Path(tmp_name)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, folder / f"{key}.txt")
+    except Exception as e:
+        logger.warning("[cache] failed to write %s entry %s: %s", kind, key[:12], e)
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
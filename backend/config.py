@@ -1,25 +1,91 @@
 #!/usr/bin/env python3
 """
 Centralized configuration and shared singletons for the backend.
-Imports remain side-effectful (env reads + prints) to preserve legacy behavior.
+Importing only reads env vars and builds the shared clients; logging setup,
+directory creation and the startup summary happen once in init().
 """
+import atexit
+import logging
+import logging.handlers
 import os
-import random
+import queue
+import sys
 import threading
 from pathlib import Path
 import secrets
 
-from openai import OpenAI
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+# Logging
+# All smallpie.* loggers hand their records to a queue; one listener thread does
+# the console writes (stdout below WARNING, stderr from WARNING up), so request
+# handlers and pipeline workers never block on terminal I/O.
+LOG_LEVEL = os.getenv("SMALLPIE_LOG_LEVEL", "INFO").upper()
+
+
+def _setup_logging():
+    log = logging.getLogger("smallpie")
+    if log.handlers:
+        return
+
+    out = logging.StreamHandler(sys.stdout)
+    out.addFilter(lambda record: record.levelno < logging.WARNING)
+    err = logging.StreamHandler(sys.stderr)
+    err.setLevel(logging.WARNING)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, out, err, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False
+
 
 # Local whisper.cpp CLI + model
-WHISPER_CLI = "/root/whisper.cpp/build/bin/whisper-cli"
-WHISPER_MODEL = "/root/whisper.cpp/models/ggml-large-v3-q5_0.bin"
+# The model is overridable so lighter weights (e.g. ggml-distil-large-v3.bin,
+# or ggml-distil-medium.en.bin for English-only meetings) can trade a little
+# accuracy for a 2-4x faster encoder without a code change.
+WHISPER_CLI = os.getenv("SMALLPIE_WHISPER_CLI", "/root/whisper.cpp/build/bin/whisper-cli")
+WHISPER_MODEL = os.getenv("SMALLPIE_WHISPER_MODEL", "/root/whisper.cpp/models/ggml-large-v3-q5_0.bin")
+# Optional Silero VAD model (e.g. ggml-silero-v5.1.2.bin). When set, whisper-cli
+# runs with --vad and skips silent stretches instead of decoding them.
+WHISPER_VAD_MODEL = os.getenv("SMALLPIE_WHISPER_VAD_MODEL", "").strip() or None
+# Optional file that collects whisper-cli's stderr (appended). Unset, the
+# diagnostics are discarded rather than buffered in a pipe.
+WHISPER_LOG = os.getenv("SMALLPIE_WHISPER_LOG", "").strip() or None
+
+# Optional resident whisper.cpp server (whisper-server). When set, chunks are
+# POSTed to it instead of spawning whisper-cli, so the model is loaded once for
+# the life of the server rather than once per batch.
+WHISPER_SERVER_URL = os.getenv("SMALLPIE_WHISPER_SERVER_URL", "").strip().rstrip("/") or None
+whisper_http = (
+    httpx.Client(base_url=WHISPER_SERVER_URL, timeout=httpx.Timeout(600.0, connect=10.0))
+    if WHISPER_SERVER_URL
+    else None
+)
 
 # Chunking / threading
 CHUNK_SECONDS = 60
-WHISPER_THREADS = 6
-WHISPER_SEMAPHORE = threading.Semaphore(1)
-print(f"[config] Whisper concurrency limit set to 1 (using {WHISPER_THREADS} threads per job)")
+# Chunks are independent, so several whisper jobs with fewer threads each keep
+# the cores busier than one wide job (better throughput, slower single chunk).
+# Threads per job default to the available cores split across the jobs, capped
+# at the historical 6 so existing deployments keep the same per-job width.
+WHISPER_CONCURRENCY = max(1, int(os.getenv("SMALLPIE_WHISPER_CONCURRENCY", "1")))  # whisper jobs at the same time
+_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+WHISPER_THREADS = int(os.getenv("SMALLPIE_WHISPER_THREADS", "0")) or max(1, min(6, _cpus // WHISPER_CONCURRENCY))
+WHISPER_SEMAPHORE = threading.BoundedSemaphore(WHISPER_CONCURRENCY)
+# Opt-in: pin each concurrent whisper job to its own block of WHISPER_THREADS
+# cores and cap the OpenMP/BLAS pools to match, so jobs don't share caches.
+WHISPER_PIN_CPUS = os.getenv("SMALLPIE_WHISPER_PIN_CPUS", "").strip().lower() in ("1", "true", "yes")
+
+# Uploads: whole-meeting pipelines allowed to run at once; further uploads queue
+PIPELINE_WORKERS = max(1, int(os.getenv("SMALLPIE_PIPELINE_WORKERS", "2")))
+
+# Live sessions: max audio blobs buffered between the WS handler and the orchestrator
+LIVE_QUEUE_MAXSIZE = int(os.getenv("SMALLPIE_LIVE_QUEUE_MAXSIZE", "256"))
 
 # Auth / token signing
 SIGNING_KEY = os.getenv("SMALLPIE_SIGNING_KEY", "").strip() or secrets.token_hex(32)
@@ -34,11 +100,43 @@ TOKEN_VERIFY_WINDOW_SECONDS = int(os.getenv("SMALLPIE_TOKEN_VERIFY_WINDOW_SECOND
 BASE_DIR = Path("/root/smallpie-data").resolve()
 AUDIO_DIR = BASE_DIR / "audio"
 MEETINGS_DIR = BASE_DIR / "meetings"
-AUDIO_DIR.mkdir(parents=True, exist_ok=True)
-MEETINGS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Scratch space for WAV chunks and whisper output. Opt-in via SMALLPIE_TMP (e.g.
+# /dev/shm/smallpie to keep the chunk churn off the disk); an upload's chunks
+# all exist at once (~1.9 MB per minute of audio), so a tmpfs must be sized for
+# the longest meeting. Unset, tempfile's default directory is used.
+_tmp_dir = os.getenv("SMALLPIE_TMP", "").strip()
+TMP_DIR: Path | None = Path(_tmp_dir).resolve() if _tmp_dir else None
+
+
+def scratch_dir() -> Path | None:
+    """TMP_DIR, created on first use so callers don't depend on init() having run."""
+    if TMP_DIR is not None:
+        TMP_DIR.mkdir(parents=True, exist_ok=True)
+    return TMP_DIR
+
+
+# Optional content-hash cache of transcripts and analyses. Off unless
+# SMALLPIE_CACHE_DIR is set: keeping meeting text around is opt-in.
+_cache_dir = os.getenv("SMALLPIE_CACHE_DIR", "").strip()
+CACHE_DIR = Path(_cache_dir).resolve() if _cache_dir else None
+CACHE_ENABLED = CACHE_DIR is not None
 
 # OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# One shared client/connection pool for the whole process. httpx drops idle
+# connections after 5s by default, which means a fresh TCP+TLS handshake for
+# nearly every meeting; keep them around long enough to be reused.
+OPENAI_KEEPALIVE_SECONDS = float(os.getenv("SMALLPIE_OPENAI_KEEPALIVE_SECONDS", "120"))
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=32,
+            max_keepalive_connections=8,
+            keepalive_expiry=OPENAI_KEEPALIVE_SECONDS,
+        ),
+    ),
+)
 
 # Email / SMTP
 SMTP_HOST = os.getenv("SMALLPIE_SMTP_HOST")
@@ -46,33 +144,75 @@ SMTP_PORT = int(os.getenv("SMALLPIE_SMTP_PORT", "587"))
 SMTP_USERNAME = os.getenv("SMALLPIE_SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMALLPIE_SMTP_PASSWORD")
 SMTP_FROM = os.getenv("SMALLPIE_SMTP_FROM") or SMTP_USERNAME or "no-reply@smallpie.local"
+# Applies to connect and to every command on the shared connection, so a hung
+# server fails the send instead of blocking every pipeline behind the SMTP lock.
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMALLPIE_SMTP_TIMEOUT_SECONDS", "30"))
 
 EMAIL_ENABLED = bool(SMTP_HOST and SMTP_USERNAME and SMTP_PASSWORD)
-if not EMAIL_ENABLED:
-    print("[email] SMTP not fully configured; email sending is disabled")
 
 # Simple bearer token auth
 ACCESS_TOKEN = os.getenv("SMALLPIE_ACCESS_TOKEN", "").strip()
 AUTH_ENABLED = bool(ACCESS_TOKEN)
 
-if AUTH_ENABLED:
-    print("[auth] Bearer token auth ENABLED for HTTP + WS")
-else:
-    print("[auth] Bearer token auth DISABLED (SMALLPIE_ACCESS_TOKEN not set)")
-
-# CORS
 # CORS
 ALLOW_ORIGINS = [
     "https://smallpie.fun",
     "https://www.smallpie.fun",
 ]  # explicit origins to avoid duplicate CORS headers
 
+_initialized = False
+
+
+def init():
+    """
+    One-time startup side effects: start the log listener, create the data
+    directories and log the effective settings. Idempotent; called from the
+    ASGI startup hook and the CLI.
+    """
+    global _initialized
+    if _initialized:
+        return
+    _initialized = True
+
+    _setup_logging()
+
+    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+    MEETINGS_DIR.mkdir(parents=True, exist_ok=True)
+
+    log = logging.getLogger("smallpie.config")
+    if WHISPER_SERVER_URL:
+        log.info("[config] using whisper-server at %s instead of whisper-cli", WHISPER_SERVER_URL)
+    log.info("[config] Whisper concurrency limit set to %s (using %s threads per job)", WHISPER_CONCURRENCY, WHISPER_THREADS)
+    if WHISPER_PIN_CPUS:
+        log.info("[config] whisper jobs pinned to disjoint CPU sets")
+    if WHISPER_VAD_MODEL:
+        log.info("[config] whisper VAD enabled with %s", WHISPER_VAD_MODEL)
+    if CACHE_ENABLED:
+        log.info("[cache] transcript/analysis cache ENABLED at %s", CACHE_DIR)
+    if not EMAIL_ENABLED:
+        log.info("[email] SMTP not fully configured; email sending is disabled")
+    if AUTH_ENABLED:
+        log.info("[auth] Bearer token auth ENABLED for HTTP + WS")
+    else:
+        log.info("[auth] Bearer token auth DISABLED (SMALLPIE_ACCESS_TOKEN not set)")
+
+
 __all__ = [
+    "init",
+    "LOG_LEVEL",
     "WHISPER_CLI",
     "WHISPER_MODEL",
+    "WHISPER_VAD_MODEL",
+    "WHISPER_LOG",
+    "WHISPER_SERVER_URL",
+    "whisper_http",
     "CHUNK_SECONDS",
     "WHISPER_THREADS",
+    "WHISPER_CONCURRENCY",
     "WHISPER_SEMAPHORE",
+    "WHISPER_PIN_CPUS",
+    "PIPELINE_WORKERS",
+    "LIVE_QUEUE_MAXSIZE",
     "SIGNING_KEY",
     "BOOTSTRAP_SECRET",
     "TOKEN_TTL_SECONDS",
@@ -83,12 +223,18 @@ __all__ = [
     "BASE_DIR",
     "AUDIO_DIR",
     "MEETINGS_DIR",
+    "TMP_DIR",
+    "scratch_dir",
+    "CACHE_DIR",
+    "CACHE_ENABLED",
+    "OPENAI_KEEPALIVE_SECONDS",
     "client",
     "SMTP_HOST",
     "SMTP_PORT",
     "SMTP_USERNAME",
     "SMTP_PASSWORD",
     "SMTP_FROM",
+    "SMTP_TIMEOUT_SECONDS",
     "EMAIL_ENABLED",
     "ACCESS_TOKEN",
     "AUTH_ENABLED",
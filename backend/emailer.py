@@ -1,5 +1,12 @@
-import sys
+import atexit
+import html as _html
+import logging
+import socket
+import threading
+import time
 from email.message import EmailMessage
+from pathlib import Path
+from string import Template
 
 import smtplib
 
@@ -8,81 +15,50 @@ try:
 except ImportError:
     import config  # type: ignore
 
+logger = logging.getLogger("smallpie.emailer")
 
-def send_analysis_via_email(
-    recipient: str | None,
-    meeting_name: str,
-    meeting_id: str,
-    folder,
-) -> None:
-    """
-    If recipient and SMTP config are available, email the analysis (and optionally transcript)
-    to the user. Best-effort only: never raise out of here.
-    Now sends a multipart email: plain text + HTML (Apple-style layout).
-    """
-    if not recipient:
-        return
-
-    if not config.EMAIL_ENABLED:
-        print("[email] EMAIL_ENABLED is False; skipping email send for", meeting_id)
-        return
-
-    try:
-        transcript_path = folder / "transcript.txt"
-        analysis_path = folder / "analysis.txt"
-
-        transcript = ""
-        analysis = ""
-
-        if analysis_path.exists():
-            try:
-                analysis = analysis_path.read_text(encoding="utf-8")
-            except Exception as e:
-                print(
-                    f"[email] failed to read analysis.txt for {meeting_id}: {e}",
-                    file=sys.stderr,
-                )
-
-        if transcript_path.exists():
-            try:
-                transcript = transcript_path.read_text(encoding="utf-8")
-            except Exception as e:
-                print(
-                    f"[email] failed to read transcript.txt for {meeting_id}: {e}",
-                    file=sys.stderr,
-                )
-
-        # --- Build text version (fallback) ---
-        text_parts: list[str] = []
-        text_parts.append(
-            f"Here are your smallpie notes for meeting '{meeting_name}' (ID: {meeting_id})."
-        )
-        text_parts.append("")
-        if analysis:
-            text_parts.append("=== ANALYSIS ===")
-            text_parts.append(analysis)
-            text_parts.append("")
-
-        if transcript:
-            text_parts.append("=== TRANSCRIPT (may be truncated) ===")
-            if len(transcript) > 15000:
-                text_parts.append(transcript[:15000])
-                text_parts.append("\n[transcript truncated]")
-            else:
-                text_parts.append(transcript)
+EMAIL_TRANSCRIPT_CHARS = 15000  # longer transcripts are truncated in the email body
 
-        text_body = "\n".join(text_parts)
+# Built once at import; only the escaped per-meeting values are substituted per send.
+_HTML_ANALYSIS_BLOCK = Template(
+    """
+          <tr>
+            <td style="padding:8px 32px 8px 32px;">
+              <div style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif; font-size:12px; letter-spacing:0.14em; text-transform:uppercase; color:#6b7280; margin-bottom:6px;">
+                Analysis
+              </div>
+              <div style="border-radius:14px; background-color:#f9fafb; border:1px solid #e5e7eb; padding:12px 14px;">
+                <div style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif; font-size:14px; color:#111827; line-height:1.5; white-space:pre-wrap;">
+                  $analysis
+                </div>
+              </div>
+            </td>
+          </tr>
+          """
+)
 
-        import html as _html
+_HTML_TRANSCRIPT_BLOCK = Template(
+    """
+          <tr>
+            <td style="padding:4px 32px 24px 32px;">
+              <div style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif; font-size:12px; letter-spacing:0.14em; text-transform:uppercase; color:#6b7280; margin-bottom:6px; margin-top:8px;">
+                Transcript
+              </div>
+              <div style="border-radius:14px; background-color:#f9fafb; border:1px solid #e5e7eb; padding:12px 14px;">
+                <div style="font-family:SFMono-Regular,Menlo,Monaco,Consolas,'Liberation Mono','Courier New',monospace; font-size:12px; color:#111827; line-height:1.5; white-space:pre-wrap;">
+                  $transcript
+                </div>
+                $truncated_note
+              </div>
+            </td>
+          </tr>
+          """
+)
 
-        esc_meeting_name = _html.escape(meeting_name)
-        esc_meeting_id = _html.escape(meeting_id)
-        esc_analysis = _html.escape(analysis) if analysis else ""
-        esc_transcript = _html.escape(
-            transcript[:15000] + ("\n[transcript truncated]" if len(transcript) > 15000 else "")
-        ) if transcript else ""
+_HTML_TRUNCATED_NOTE = "<div style='font-family:-apple-system,BlinkMacSystemFont,\\'Segoe UI\\',sans-serif; font-size:11px; color:#9ca3af; margin-top:6px;'>Transcript truncated for email display.</div>"
 
-        html_body = f"""\
+_HTML_TEMPLATE = Template(
+    """\
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -104,7 +80,7 @@ def send_analysis_via_email(
                 Meeting summary
               </div>
               <div style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif; font-size:13px; color:#9ca3af; margin-top:6px;">
-                {esc_meeting_name}
+                $meeting_name
               </div>
             </td>
           </tr>
@@ -113,7 +89,7 @@ def send_analysis_via_email(
           <tr>
             <td style="padding:16px 32px 8px 32px;">
               <div style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif; font-size:13px; color:#6b7280; line-height:1.4;">
-                ID: <span style="color:#111827; font-weight:500;">{esc_meeting_id}</span>
+                ID: <span style="color:#111827; font-weight:500;">$meeting_id</span>
               </div>
               <div style="height:12px;"></div>
               <div style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif; font-size:14px; color:#111827; line-height:1.5;">
@@ -124,43 +100,10 @@ def send_analysis_via_email(
           </tr>
 
           <!-- Analysis -->
-          {""
-          if not esc_analysis
-          else f"""
-          <tr>
-            <td style="padding:8px 32px 8px 32px;">
-              <div style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif; font-size:12px; letter-spacing:0.14em; text-transform:uppercase; color:#6b7280; margin-bottom:6px;">
-                Analysis
-              </div>
-              <div style="border-radius:14px; background-color:#f9fafb; border:1px solid #e5e7eb; padding:12px 14px;">
-                <div style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif; font-size:14px; color:#111827; line-height:1.5; white-space:pre-wrap;">
-                  {esc_analysis}
-                </div>
-              </div>
-            </td>
-          </tr>
-          """
-          }
+          $analysis_block
 
           <!-- Transcript -->
-          {""
-          if not esc_transcript
-          else f"""
-          <tr>
-            <td style="padding:4px 32px 24px 32px;">
-              <div style="font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif; font-size:12px; letter-spacing:0.14em; text-transform:uppercase; color:#6b7280; margin-bottom:6px; margin-top:8px;">
-                Transcript
-              </div>
-              <div style="border-radius:14px; background-color:#f9fafb; border:1px solid #e5e7eb; padding:12px 14px;">
-                <div style="font-family:SFMono-Regular,Menlo,Monaco,Consolas,'Liberation Mono','Courier New',monospace; font-size:12px; color:#111827; line-height:1.5; white-space:pre-wrap;">
-                  {esc_transcript}
-                </div>
-                {"<div style='font-family:-apple-system,BlinkMacSystemFont,\\'Segoe UI\\',sans-serif; font-size:11px; color:#9ca3af; margin-top:6px;'>Transcript truncated for email display.</div>" if len(transcript) > 15000 else ""}
-              </div>
-            </td>
-          </tr>
-          """
-          }
+          $transcript_block
 
           <!-- Footer -->
           <tr>
@@ -179,6 +122,165 @@ def send_analysis_via_email(
 </body>
 </html>
 """
+)
+
+
+# One authenticated SMTP connection shared by all sends, so consecutive emails
+# skip the TCP + STARTTLS + LOGIN round trips. The lock serializes its use.
+# Connections idle for longer than SMTP_IDLE_SECONDS are replaced rather than
+# probed, since most servers drop idle sessions on their own anyway.
+SMTP_IDLE_SECONDS = 60.0
+_smtp: smtplib.SMTP | None = None
+_smtp_last = 0.0
+_smtp_lock = threading.Lock()
+
+
+def _drop_smtp():
+    """Close and forget the shared connection. Caller holds _smtp_lock."""
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.close()
+        except Exception:
+            pass
+    _smtp = None
+
+
+def _get_smtp() -> smtplib.SMTP:
+    """
+    Return the shared connection, reconnecting if it was never opened or the
+    server dropped it (checked with a NOOP). Caller holds _smtp_lock.
+    The NOOP is bounded by SMTP_TIMEOUT_SECONDS; a server that stalls it is
+    treated as gone and replaced.
+    """
+    global _smtp, _smtp_last
+    if _smtp is not None:
+        if time.monotonic() - _smtp_last <= SMTP_IDLE_SECONDS:
+            try:
+                if _smtp.noop()[0] == 250:
+                    _smtp_last = time.monotonic()
+                    return _smtp
+            except (socket.timeout, smtplib.SMTPException, OSError) as e:
+                logger.debug("[email] shared SMTP connection failed its NOOP, reconnecting: %s", e)
+        _drop_smtp()
+
+    server = smtplib.SMTP(config.SMTP_HOST, config.SMTP_PORT, timeout=config.SMTP_TIMEOUT_SECONDS)
+    try:
+        server.starttls()
+        if config.SMTP_USERNAME and config.SMTP_PASSWORD:
+            server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    _smtp = server
+    _smtp_last = time.monotonic()
+    return server
+
+
+@atexit.register
+def _close_smtp():
+    """Say QUIT on the shared connection at interpreter exit."""
+    with _smtp_lock:
+        if _smtp is not None:
+            try:
+                _smtp.quit()
+            except Exception:
+                pass
+        _drop_smtp()
+
+
+def _read_prefix(path: Path, limit: int) -> tuple[str, bool]:
+    """Read at most limit characters of a UTF-8 file; also report whether there was more."""
+    with path.open("r", encoding="utf-8") as f:
+        data = f.read(limit + 1)
+    return data[:limit], len(data) > limit
+
+
+def send_analysis_via_email(
+    recipient: str | None,
+    meeting_name: str,
+    meeting_id: str,
+    folder,
+    transcript: str | None = None,
+    analysis: str | None = None,
+) -> None:
+    """
+    If recipient and SMTP config are available, email the analysis (and optionally transcript)
+    to the user. Best-effort only: never raise out of here.
+    Now sends a multipart email: plain text + HTML (Apple-style layout).
+    Texts passed in directly are used as-is; missing ones are read from folder.
+    """
+    if not recipient:
+        return
+
+    if not config.EMAIL_ENABLED:
+        logger.info("[email] EMAIL_ENABLED is False; skipping email send for %s", meeting_id)
+        return
+
+    try:
+        transcript_path = folder / "transcript.txt"
+        analysis_path = folder / "analysis.txt"
+
+        transcript_truncated = False
+        full_transcript = transcript
+        if transcript is not None:
+            transcript_truncated = len(transcript) > EMAIL_TRANSCRIPT_CHARS
+            transcript = transcript[:EMAIL_TRANSCRIPT_CHARS]
+        else:
+            transcript = ""
+            if transcript_path.exists():
+                try:
+                    transcript, transcript_truncated = _read_prefix(transcript_path, EMAIL_TRANSCRIPT_CHARS)
+                except Exception as e:
+                    logger.warning("[email] failed to read transcript.txt for %s: %s", meeting_id, e)
+
+        if analysis is None:
+            analysis = ""
+            if analysis_path.exists():
+                try:
+                    analysis = analysis_path.read_text(encoding="utf-8")
+                except Exception as e:
+                    logger.warning("[email] failed to read analysis.txt for %s: %s", meeting_id, e)
+
+        # --- Build text version (fallback) ---
+        text_parts: list[str] = []
+        text_parts.append(
+            f"Here are your smallpie notes for meeting '{meeting_name}' (ID: {meeting_id})."
+        )
+        text_parts.append("")
+        if analysis:
+            text_parts.append("=== ANALYSIS ===")
+            text_parts.append(analysis)
+            text_parts.append("")
+
+        if transcript:
+            text_parts.append("=== TRANSCRIPT (may be truncated) ===")
+            text_parts.append(transcript)
+            if transcript_truncated:
+                text_parts.append("\n[transcript truncated]")
+
+        text_body = "\n".join(text_parts)
+
+        esc_meeting_name = _html.escape(meeting_name)
+        esc_meeting_id = _html.escape(meeting_id)
+        esc_analysis = _html.escape(analysis) if analysis else ""
+        esc_transcript = _html.escape(
+            transcript + ("\n[transcript truncated]" if transcript_truncated else "")
+        ) if transcript else ""
+
+        html_body = _HTML_TEMPLATE.substitute(
+            meeting_name=esc_meeting_name,
+            meeting_id=esc_meeting_id,
+            analysis_block=_HTML_ANALYSIS_BLOCK.substitute(analysis=esc_analysis) if esc_analysis else "",
+            transcript_block=(
+                _HTML_TRANSCRIPT_BLOCK.substitute(
+                    transcript=esc_transcript,
+                    truncated_note=_HTML_TRUNCATED_NOTE if transcript_truncated else "",
+                )
+                if esc_transcript
+                else ""
+            ),
+        )
 
         msg = EmailMessage()
         msg["Subject"] = f"[smallpie] Notes for '{meeting_name}'"
@@ -188,16 +290,27 @@ def send_analysis_via_email(
         msg.set_content(text_body)
         msg.add_alternative(html_body, subtype="html")
 
-        with smtplib.SMTP(config.SMTP_HOST, config.SMTP_PORT) as server:
-            server.starttls()
-            if config.SMTP_USERNAME and config.SMTP_PASSWORD:
-                server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
-            server.send_message(
-                msg,
-                from_addr=config.SMTP_FROM,
-                to_addrs=[recipient],
-            )
-
-        print(f"[email] sent meeting {meeting_id} to {recipient}")
+        # The body only shows a prefix; long transcripts also go out in full
+        # as an attachment, encoded once straight from the text we have.
+        if transcript_truncated:
+            try:
+                raw = full_transcript.encode("utf-8") if full_transcript is not None else transcript_path.read_bytes()
+                msg.add_attachment(raw, maintype="text", subtype="plain", filename="transcript.txt")
+            except Exception as e:
+                logger.warning("[email] failed to attach transcript for %s: %s", meeting_id, e)
+
+        with _smtp_lock:
+            server = _get_smtp()
+            try:
+                server.send_message(
+                    msg,
+                    from_addr=config.SMTP_FROM,
+                    to_addrs=[recipient],
+                )
+            except (smtplib.SMTPServerDisconnected, OSError):
+                _drop_smtp()
+                raise
+
+        logger.info("[email] sent meeting %s to %s", meeting_id, recipient)
     except Exception as e:
-        print(f"[email] failed to send email for meeting {meeting_id}: {e}", file=sys.stderr)
+        logger.warning("[email] failed to send email for meeting %s: %s", meeting_id, e)
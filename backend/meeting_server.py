@@ -24,6 +24,8 @@ except ImportError:
 
 
 def cli_main():
+    config.init()
+
     if len(sys.argv) < 2:
         print("Usage: python meeting_server.py <audio_file> [meeting_name] [meeting_topic] [participants]")
         sys.exit(1)
@@ -1,48 +1,62 @@
+import logging
 import queue
 import subprocess
-import sys
 import tempfile
 import threading
 import uuid
-import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from threading import Thread
 
 try:
     from . import config  # type: ignore
     from .analysis import analyze_with_gpt  # type: ignore
-    from .audio import convert_to_wav, transcribe_wav_file  # type: ignore
+    from .audio import convert_and_segment, transcribe_chunks, transcribe_wav_file, transcribe_wav_segments  # type: ignore
+    from .cache import cache_get, cache_put, file_sha256, text_sha256  # type: ignore
     from .emailer import send_analysis_via_email  # type: ignore
     from .storage import save_meeting_outputs, cleanup_meeting_folder  # type: ignore
 except ImportError:
     import config  # type: ignore
     from analysis import analyze_with_gpt  # type: ignore
-    from audio import convert_to_wav, transcribe_wav_file  # type: ignore
+    from audio import convert_and_segment, transcribe_chunks, transcribe_wav_file, transcribe_wav_segments  # type: ignore
+    from cache import cache_get, cache_put, file_sha256, text_sha256  # type: ignore
     from emailer import send_analysis_via_email  # type: ignore
     from storage import save_meeting_outputs, cleanup_meeting_folder  # type: ignore
 
+logger = logging.getLogger("smallpie.pipeline")
+
+LIVE_COALESCE_MAX_BLOBS = 16
+LIVE_COALESCE_BYTES = 1024 * 1024  # per-session scratch buffer for coalesced writes
+
+PIPELINE_POOL = ThreadPoolExecutor(max_workers=config.PIPELINE_WORKERS, thread_name_prefix="smallpie-pipeline")
+# Uploads submitted to PIPELINE_POOL that have not finished yet (running or queued).
+_pipeline_pending = 0
+_pipeline_pending_lock = threading.Lock()
+
 
 class ThreadSafeTranscript:
     """
     Safely collects transcript parts from multiple worker threads
     and ensures they are stored in the correct order.
+    Parts live in a list indexed by chunk, so assembling needs no sort; the
+    lock is only taken to grow the list (a slot store is atomic in CPython).
     """
 
     def __init__(self):
-        self.parts: dict[int, str] = {}
+        self.parts: list[str | None] = []
         self.lock = threading.Lock()
 
     def add(self, index: int, text: str):
         """Adds a transcript part from a chunk at a specific index."""
-        with self.lock:
-            self.parts[index] = text
-            print(f"[pipeline-live] stored transcript for chunk {index}")
+        if index >= len(self.parts):
+            with self.lock:
+                if index >= len(self.parts):
+                    self.parts.extend([None] * (index + 1 - len(self.parts)))
+        self.parts[index] = text
+        logger.debug("[pipeline-live] stored transcript for chunk %s", index)
 
     def get_full_transcript(self) -> str:
         """Assembles the final transcript in order."""
-        with self.lock:
-            sorted_parts = [self.parts[k] for k in sorted(self.parts.keys())]
-            return "\n\n".join(p for p in sorted_parts if p.strip())
+        return "\n\n".join(p for p in list(self.parts) if p is not None and p.strip())
 
 
 def process_wav_chunk_thread(
@@ -55,107 +69,122 @@ def process_wav_chunk_thread(
     Takes one *WAV* chunk, processes it, and stores the text.
     """
     try:
-        print(f"[pipeline-live] worker starting for WAV chunk {chunk_index} ({wav_chunk_path})")
+        logger.info("[pipeline-live] worker starting for WAV chunk %s (%s)", chunk_index, wav_chunk_path)
 
         chunk_transcript = transcribe_wav_file(wav_chunk_path)
         transcript_store.add(chunk_index, chunk_transcript)
-        print(f"[pipeline-live] worker completed for chunk {chunk_index}")
+        logger.info("[pipeline-live] worker completed for chunk %s", chunk_index)
 
     except Exception as e:
-        print(f"[pipeline-live] FATAL ERROR processing chunk {chunk_index}: {e}", file=sys.stderr)
+        logger.error("[pipeline-live] FATAL ERROR processing chunk %s: %s", chunk_index, e)
         transcript_store.add(chunk_index, f"[[ERROR: Failed to transcribe chunk {chunk_index}]]")
 
 
-def build_and_extract_wav_chunk(
-    part_files: list[Path],
-    start_sec: float,
-    duration_sec: float | None,
-    chunk_index: int,
-) -> Path | None:
+def process_wav_batch_thread(
+    wav_chunk_paths: list[Path],
+    first_index: int,
+    transcript_store: ThreadSafeTranscript,
+):
     """
-    1. Binary-appends all part_files into a single .webm stream.
-    2. Uses ffmpeg to seek, convert, and extract the desired WAV chunk.
-    3. Cleans up the large .webm stream file.
+    Worker for a backlog of finished segments: one whisper run (and one
+    model load) covers all of them, each text is stored at its own index.
     """
-    full_stream_path = Path(tempfile.NamedTemporaryFile(delete=False, suffix=".webm").name)
+    last_index = first_index + len(wav_chunk_paths) - 1
     try:
-        print(f"[orchestrator] building full stream for chunk {chunk_index} from {len(part_files)} parts...")
-        with full_stream_path.open("wb") as f_out:
-            for part_path in part_files:
-                f_out.write(part_path.read_bytes())
-
-        wav_chunk_path = Path(tempfile.NamedTemporaryFile(delete=False, suffix=".wav").name)
-
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i",
-            str(full_stream_path),
-            "-ss",
-            str(start_sec),
-        ]
-        if duration_sec is not None:
-            cmd.extend(["-t", str(duration_sec)])
-
-        cmd.extend(
-            [
-                "-ac",
-                "1",
-                "-ar",
-                "16000",
-                str(wav_chunk_path),
-            ]
-        )
-
-        print(f"[orchestrator] extracting chunk {chunk_index}: {' '.join(cmd)}")
-        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-
-        if wav_chunk_path.exists() and wav_chunk_path.stat().st_size > 44:
-            return wav_chunk_path
-        else:
-            print(f"[orchestrator] extraction for chunk {chunk_index} produced empty file")
-            try:
-                wav_chunk_path.unlink()
-            except FileNotFoundError:
-                pass
-            return None
+        logger.info("[pipeline-live] worker starting for WAV chunks %s-%s", first_index, last_index)
+        texts = transcribe_wav_segments(wav_chunk_paths)
+        for offset, text in enumerate(texts):
+            transcript_store.add(first_index + offset, text)
+        logger.info("[pipeline-live] worker completed for chunks %s-%s", first_index, last_index)
 
-    except subprocess.CalledProcessError as e:
-        print(
-            f"[orchestrator] FATAL: ffmpeg extraction failed for chunk {chunk_index}: {e.stderr.decode()}",
-            file=sys.stderr,
-        )
-        return None
     except Exception as e:
-        print(f"[orchestrator] FATAL: build_and_extract failed for chunk {chunk_index}: {e}", file=sys.stderr)
-        return None
-    finally:
-        try:
-            full_stream_path.unlink()
-        except FileNotFoundError:
-            pass
+        logger.error("[pipeline-live] FATAL ERROR processing chunks %s-%s: %s", first_index, last_index, e)
+        for index in range(first_index, last_index + 1):
+            transcript_store.add(index, f"[[ERROR: Failed to transcribe chunk {index}]]")
 
 
-def extraction_and_transcription_thread(
-    part_files: list[Path],
-    start_sec: float,
-    duration_sec: float | None,
-    chunk_index: int,
-    transcript_store: ThreadSafeTranscript,
-):
+def start_live_segmenter(seg_dir: Path, log_file) -> subprocess.Popen:
     """
-    Thread target that builds/extracts a chunk and transcribes it.
+    Start the session's ffmpeg: it reads the browser's webm stream on stdin as
+    it arrives, decodes it to mono 16 kHz and writes CHUNK_SECONDS WAV segments
+    (live_0000.wav, live_0001.wav, ...) into seg_dir. Its errors go to log_file.
     """
-    try:
-        wav_chunk = build_and_extract_wav_chunk(part_files, start_sec, duration_sec, chunk_index)
-
-        if wav_chunk:
-            process_wav_chunk_thread(wav_chunk, chunk_index, transcript_store)
-        else:
-            print(f"[orchestrator] skipping transcription for chunk {chunk_index}, extraction failed.")
-    except Exception as e:
-        print(f"[orchestrator] FATAL unhandled error in worker thread for chunk {chunk_index}: {e}", file=sys.stderr)
-        transcript_store.add(chunk_index, f"[[ERROR: Worker thread failed for chunk {chunk_index}]]")
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-threads",
+        "0",
+        "-i",
+        "pipe:0",
+        "-ac",
+        "1",
+        "-ar",
+        "16000",
+        "-vn",
+        "-f",
+        "segment",
+        "-segment_format",
+        "wav",
+        "-segment_time",
+        str(config.CHUNK_SECONDS),
+        "-reset_timestamps",
+        "1",
+        str(seg_dir / "live_%04d.wav"),
+    ]
+    logger.info("[orchestrator] starting live segmenter: %s", " ".join(cmd))
+    # Unbuffered stdin: every coalesced write reaches ffmpeg immediately
+    # (write_coalesced loops until each write has gone through completely).
+    return subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=log_file, bufsize=0)
+
+
+def _write_all(dst, data):
+    """Write all of data to a raw (unbuffered) stream, which may accept only part per call."""
+    view = memoryview(data)
+    while view:
+        view = view[dst.write(view) :]
+
+
+def write_coalesced(dst, blobs: list[bytes], scratch: memoryview) -> int:
+    """
+    Write blobs to dst through a reused scratch buffer: one write per filled
+    buffer and no fresh joined bytes per burst. Returns the bytes written.
+    """
+    if len(blobs) == 1:
+        _write_all(dst, blobs[0])
+        return len(blobs[0])
+
+    used = total = 0
+    for blob in blobs:
+        size = len(blob)
+        total += size
+        if used + size > len(scratch):
+            if used:
+                _write_all(dst, scratch[:used])
+                used = 0
+            if size > len(scratch):
+                _write_all(dst, blob)
+                continue
+        scratch[used : used + size] = blob
+        used += size
+    if used:
+        _write_all(dst, scratch[:used])
+    return total
+
+
+def completed_segment(seg_dir: Path, index: int, final: bool) -> Path | None:
+    """
+    Return segment `index` once ffmpeg is done with it: either the next
+    segment has been opened, or ffmpeg has exited (final). Otherwise None.
+    """
+    seg = seg_dir / f"live_{index:04d}.wav"
+    if not seg.exists():
+        return None
+    if final or (seg_dir / f"live_{index + 1:04d}.wav").exists():
+        return seg
+    return None
 
 
 def full_meeting_pipeline(
@@ -170,38 +199,45 @@ def full_meeting_pipeline(
     if meeting_id is None:
         meeting_id = uuid.uuid4().hex
 
-    print(f"[pipeline-upload] starting full pipeline for meeting_id={meeting_id}")
+    logger.info("[pipeline-upload] starting full pipeline for meeting_id=%s", meeting_id)
 
     folder: Path | None = None
     try:
-        try:
-            wav_path = convert_to_wav(audio_path)
-        except subprocess.CalledProcessError as e:
-            print(
-                f"[pipeline-upload] FATAL: convert_to_wav failed for {audio_path}: {e.stderr.decode()}",
-                file=sys.stderr,
-            )
-            return
+        transcript_key = text_sha256(config.WHISPER_MODEL, config.WHISPER_VAD_MODEL or "", file_sha256(audio_path)) if config.CACHE_ENABLED else ""
+        transcript = cache_get("transcript", transcript_key) if transcript_key else None
 
-        if not wav_path.exists() or wav_path.stat().st_size == 0:
-            print(f"[pipeline-upload] conversion failed for {audio_path}")
-            return
+        if transcript is None:
+            # One ffmpeg pass decodes, resamples and segments the upload;
+            # the caller's file is only read, never replaced or deleted here.
+            with tempfile.TemporaryDirectory(prefix="smallpie_chunks_", dir=config.scratch_dir()) as chunk_dir:
+                try:
+                    chunks = convert_and_segment(audio_path, config.CHUNK_SECONDS, Path(chunk_dir))
+                except subprocess.CalledProcessError as e:
+                    logger.error("[pipeline-upload] FATAL: ffmpeg failed for %s: %s", audio_path, e.stderr.decode())
+                    return
+
+                if not chunks:
+                    logger.warning("[pipeline-upload] conversion produced no audio for %s", audio_path)
+                    return
 
-        transcript = transcribe_wav_file(wav_path)
+                transcript = transcribe_chunks(chunks)
+
+            if transcript_key and transcript.strip():
+                cache_put("transcript", transcript_key, transcript)
 
         if not transcript.strip():
-            print(f"[pipeline-upload] empty transcript for {meeting_id}, aborting")
+            logger.info("[pipeline-upload] empty transcript for %s, aborting", meeting_id)
             return
 
         analysis = analyze_with_gpt(meeting_name, meeting_topic, participants, transcript)
         folder = save_meeting_outputs(meeting_id, meeting_name, transcript, analysis)
 
         try:
-            send_analysis_via_email(user_email, meeting_name, meeting_id, folder)
+            send_analysis_via_email(user_email, meeting_name, meeting_id, folder, transcript=transcript, analysis=analysis)
         except Exception as e:
-            print(f"[email] unexpected exception in full_meeting_pipeline for {meeting_id}: {e}", file=sys.stderr)
+            logger.warning("[email] unexpected exception in full_meeting_pipeline for %s: %s", meeting_id, e)
 
-        print(f"[pipeline-upload] meeting {meeting_id} complete, stored at {folder}")
+        logger.info("[pipeline-upload] meeting %s complete, stored at %s", meeting_id, folder)
     finally:
         if folder:
             cleanup_meeting_folder(folder)
@@ -219,103 +255,122 @@ def live_transcription_orchestrator(
 ):
     """
     Background thread for a live session.
+    Blobs are piped into one ffmpeg that decodes and segments while the meeting
+    is still being recorded; each finished segment goes straight to a worker.
     """
     folder: Path | None = None
     chunk_index = 0
     processing_threads: list[threading.Thread] = []
 
-    all_part_files: list[Path] = []
-    part_index = 0
-    chunk_start_time = time.time()
+    work_dir: tempfile.TemporaryDirectory | None = None
+    seg_dir: Path | None = None
+    segmenter_log = None
+    segmenter: subprocess.Popen | None = None
+    scratch = memoryview(bytearray(LIVE_COALESCE_BYTES))
+
+    def dispatch_completed(final: bool):
+        nonlocal chunk_index
+        ready: list[Path] = []
+        while (seg := completed_segment(seg_dir, chunk_index + len(ready), final)) is not None:
+            ready.append(seg)
+        if not ready:
+            return
+
+        # Several segments finishing together (a backlog, or the last full
+        # segment plus the short tail at stop) share one whisper run.
+        if len(ready) == 1:
+            logger.info("[orchestrator] segment %s complete, dispatching", chunk_index)
+            target, args = process_wav_chunk_thread, (ready[0], chunk_index, transcript_store)
+        else:
+            logger.info("[orchestrator] segments %s-%s complete, dispatching as one batch", chunk_index, chunk_index + len(ready) - 1)
+            target, args = process_wav_batch_thread, (ready, chunk_index, transcript_store)
+        t = threading.Thread(target=target, args=args, daemon=True)
+        t.start()
+        processing_threads.append(t)
+        chunk_index += len(ready)
 
     try:
+        # Setup is inside the try so a failed spawn (ffmpeg missing, EMFILE,
+        # ENOMEM) is logged, stops the WS side and still cleans up.
+        work_dir = tempfile.TemporaryDirectory(prefix="smallpie_live_", dir=config.scratch_dir())
+        seg_dir = Path(work_dir.name)
+        segmenter_log = tempfile.TemporaryFile(dir=seg_dir)
+        try:
+            segmenter = start_live_segmenter(seg_dir, segmenter_log)
+        except OSError as e:
+            logger.error("[orchestrator] live segmenter failed to start for meeting %s: %s", meeting_id, e)
+            recording_stopped.set()
+            return
+
         while True:
+            is_stopped = recording_stopped.is_set()
             try:
-                blob = data_queue.get(timeout=0.5)
-                part_path = config.AUDIO_DIR / f"{meeting_id}_part_{part_index:04d}.webm"
-                part_path.write_bytes(blob)
-                all_part_files.append(part_path)
-                part_index += 1
+                blobs = [data_queue.get(timeout=0.5)]
+                # Drain whatever else is already queued so a burst of small
+                # frames becomes one write instead of one per frame.
+                while len(blobs) < LIVE_COALESCE_MAX_BLOBS:
+                    try:
+                        blobs.append(data_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    write_coalesced(segmenter.stdin, blobs, scratch)
+                except OSError as e:
+                    # ffmpeg is gone (e.g. a corrupt frame): keep what it already
+                    # cut and tell the WS handler to stop sending.
+                    logger.error("[orchestrator] live segmenter stopped accepting audio: %s", e)
+                    recording_stopped.set()
+                    break
             except queue.Empty:
-                pass
+                if is_stopped:
+                    logger.info("[orchestrator] recording stopped, breaking main loop")
+                    break
 
-            now = time.time()
-            is_stopped = recording_stopped.is_set()
+            dispatch_completed(final=False)
 
-            if (now - chunk_start_time > config.CHUNK_SECONDS) and not is_stopped:
-                print(f"[orchestrator] {config.CHUNK_SECONDS}s passed, cutting chunk {chunk_index}")
-
-                if all_part_files:
-                    start_sec = chunk_index * config.CHUNK_SECONDS
-
-                    t = threading.Thread(
-                        target=extraction_and_transcription_thread,
-                        args=(
-                            list(all_part_files),
-                            start_sec,
-                            config.CHUNK_SECONDS,
-                            chunk_index,
-                            transcript_store,
-                        ),
-                        daemon=True,
-                    )
-                    t.start()
-                    processing_threads.append(t)
-                else:
-                    print(f"[orchestrator] timer fired but no parts to process for chunk {chunk_index}")
-
-                chunk_index += 1
-                chunk_start_time = now
-
-            elif is_stopped:
-                print("[orchestrator] recording stopped, breaking main loop")
-                break
-
-        print("[orchestrator] processing final audio segment...")
-        if all_part_files:
-            start_sec = chunk_index * config.CHUNK_SECONDS
-
-            t = threading.Thread(
-                target=extraction_and_transcription_thread,
-                args=(
-                    list(all_part_files),
-                    start_sec,
-                    None,
-                    chunk_index,
-                    transcript_store,
-                ),
-                daemon=True,
-            )
-            t.start()
-            processing_threads.append(t)
-        else:
-            print("[orchestrator] no final audio parts to process")
-
-        print(f"[orchestrator] waiting for {len(processing_threads)} chunk(s) to finish... (queue is managed by semaphore)")
+        # EOF on stdin lets ffmpeg finish the last (short) segment.
+        try:
+            segmenter.stdin.close()
+        except OSError:
+            pass
+        segmenter.wait()
+        if segmenter.returncode != 0:
+            segmenter_log.seek(0)
+            err = segmenter_log.read()[-4096:].decode("utf-8", errors="replace").strip()
+            logger.error("[orchestrator] live segmenter exited with code %s: %s", segmenter.returncode, err)
+
+        # Also runs after a segmenter failure: whatever it managed to cut is kept.
+        logger.info("[orchestrator] processing final audio segment...")
+        dispatched = chunk_index
+        dispatch_completed(final=True)
+        if chunk_index == dispatched:
+            logger.info("[orchestrator] no final audio to process")
+
+        logger.info("[orchestrator] waiting for %s chunk(s) to finish... (queue is managed by semaphore)", len(processing_threads))
         for t in processing_threads:
             t.join()
 
-        print("[orchestrator] all chunks processed.")
+        logger.info("[orchestrator] all chunks processed.")
 
         transcript = transcript_store.get_full_transcript()
-        print(f"[orchestrator] final transcript length: {len(transcript)}")
+        logger.info("[orchestrator] final transcript length: %s", len(transcript))
 
         if not transcript.strip():
-            print("[orchestrator] empty transcript, skipping GPT analysis")
+            logger.info("[orchestrator] empty transcript, skipping GPT analysis")
             return
 
         analysis = analyze_with_gpt(meeting_name, meeting_topic, participants, transcript)
         folder = save_meeting_outputs(meeting_id, meeting_name, transcript, analysis)
 
         try:
-            send_analysis_via_email(user_email, meeting_name, meeting_id, folder)
+            send_analysis_via_email(user_email, meeting_name, meeting_id, folder, transcript=transcript, analysis=analysis)
         except Exception as e:
-            print(f"[email] unexpected exception in orchestrator for {meeting_id}: {e}", file=sys.stderr)
+            logger.warning("[email] unexpected exception in orchestrator for %s: %s", meeting_id, e)
 
-        print(f"[orchestrator] meeting {meeting_id} complete, stored at {folder}")
+        logger.info("[orchestrator] meeting %s complete, stored at %s", meeting_id, folder)
 
     except Exception as e:
-        print(f"[orchestrator] FATAL ERROR for meeting {meeting_id}: {e}", file=sys.stderr)
+        logger.error("[orchestrator] FATAL ERROR for meeting %s: %s", meeting_id, e)
         try:
             transcript = transcript_store.get_full_transcript()
             if transcript:
@@ -323,14 +378,18 @@ def live_transcription_orchestrator(
                     meeting_id, f"FAILED_{meeting_name}", transcript, f"ANALYSIS FAILED:\n{e}"
                 )
         except Exception as save_e:
-            print(f"[orchestrator] failed to save error state: {save_e}", file=sys.stderr)
+            logger.warning("[orchestrator] failed to save error state: %s", save_e)
     finally:
-        print(f"[orchestrator] cleaning up {len(all_part_files)} part files...")
-        for part_path in all_part_files:
-            try:
-                part_path.unlink()
-            except FileNotFoundError:
-                pass
+        logger.info("[orchestrator] cleaning up live segments in %s...", seg_dir)
+        if segmenter is not None and segmenter.poll() is None:
+            segmenter.kill()
+            segmenter.wait()
+        for t in processing_threads:
+            t.join()
+        if segmenter_log is not None:
+            segmenter_log.close()
+        if work_dir is not None:
+            work_dir.cleanup()
         if folder:
             cleanup_meeting_folder(folder)
 
@@ -342,15 +401,53 @@ def start_full_pipeline_in_thread(
     participants: str,
     meeting_id: str,
     user_email: str | None = None,
-):
+) -> int:
+    """
+    Queue an uploaded meeting on PIPELINE_POOL. At most PIPELINE_WORKERS run at
+    once; later uploads wait their turn instead of piling up threads (and
+    transcripts) behind the whisper semaphore.
+    Returns how many uploads are queued ahead of this one, i.e. beyond the
+    free workers (0 when a worker can take it right away).
+    """
+    global _pipeline_pending
+
     def _run():
+        global _pipeline_pending
         try:
             full_meeting_pipeline(audio_path, meeting_name, meeting_topic, participants, meeting_id, user_email=user_email)
+        except Exception as e:
+            logger.error("[pipeline-upload] FATAL ERROR for meeting %s: %s", meeting_id, e)
         finally:
             try:
                 audio_path.unlink()
-                print(f"[upload] cleaned up {audio_path}")
+                logger.info("[upload] cleaned up %s", audio_path)
             except FileNotFoundError:
                 pass
-
-    Thread(target=_run, daemon=True).start()
+            with _pipeline_pending_lock:
+                _pipeline_pending -= 1
+
+    def _on_done(future):
+        # Cancelled at shutdown before a worker took it: _run never ran, so
+        # the raw upload is still on disk for a retry.
+        global _pipeline_pending
+        if future.cancelled():
+            with _pipeline_pending_lock:
+                _pipeline_pending -= 1
+            logger.warning("[pipeline-upload] meeting %s cancelled at shutdown, raw upload kept at %s", meeting_id, audio_path)
+
+    with _pipeline_pending_lock:
+        queued = max(0, _pipeline_pending - config.PIPELINE_WORKERS)
+        _pipeline_pending += 1
+    PIPELINE_POOL.submit(_run).add_done_callback(_on_done)
+    logger.info("[pipeline-upload] meeting %s queued, %s upload(s) ahead of it waiting for a worker", meeting_id, queued)
+    return queued
+
+
+def shutdown_pipeline_pool():
+    """
+    Stop taking uploads and drop the ones still queued, so a restart doesn't
+    wait for the whole backlog to be transcribed. Pipelines already running
+    are not interrupted; the interpreter still waits for those at exit.
+    """
+    logger.info("[pipeline-upload] shutting down, cancelling queued uploads")
+    PIPELINE_POOL.shutdown(wait=False, cancel_futures=True)
@@ -1,11 +1,22 @@
-from pathlib import Path
+import logging
+import os
 import shutil
+from pathlib import Path
 
 try:
     from . import config  # type: ignore
 except ImportError:
     import config  # type: ignore
 
+logger = logging.getLogger("smallpie.storage")
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write data to path via a sibling .tmp file and os.replace, so readers never see a partial file."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
 
 def save_meeting_outputs(meeting_id: str, meeting_name: str, transcript: str, analysis: str) -> Path:
     """
@@ -16,10 +27,11 @@ def save_meeting_outputs(meeting_id: str, meeting_name: str, transcript: str, an
     folder = config.MEETINGS_DIR / f"meeting_{meeting_id}_{safe_name}"
     folder.mkdir(parents=True, exist_ok=True)
 
-    (folder / "transcript.txt").write_text(transcript, encoding="utf-8")
-    (folder / "analysis.txt").write_text(analysis, encoding="utf-8")
+    # Encode once and write bytes: skips the text-mode wrapper and its buffer copy.
+    _write_atomic(folder / "transcript.txt", transcript.encode("utf-8"))
+    _write_atomic(folder / "analysis.txt", analysis.encode("utf-8"))
 
-    print("[save] outputs written to", folder)
+    logger.info("[save] outputs written to %s", folder)
     return folder
 
 
@@ -27,6 +39,6 @@ def cleanup_meeting_folder(folder: Path):
     """Remove a meeting folder and its contents, ignoring missing folders."""
     try:
         shutil.rmtree(folder, ignore_errors=True)
-        print("[cleanup] removed meeting folder", folder)
+        logger.info("[cleanup] removed meeting folder %s", folder)
     except Exception as e:
-        print(f"[cleanup] failed to remove meeting folder {folder}: {e}")
+        logger.warning("[cleanup] failed to remove meeting folder %s: %s", folder, e)